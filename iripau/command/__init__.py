@@ -16,6 +16,7 @@ import psutil
 
 from pty import spawn
 from typing import Iterable
+from subprocess import PIPE as _PIPE, run as _run
 from socket import gethostname
 from getpass import getuser
 
@@ -34,11 +35,24 @@ LOCALHOSTS = {None, "localhost", gethostname()} | {
 }
 
 
+def _tput(capability):
+    """ Return the value of a terminal capability without spawning a shell
+
+        Raises:
+            ValueError: If tput fails or prints nothing, e.g. when TERM is not set.
+    """
+    output = _run(["tput", capability], stdout=_PIPE, text=True)
+    value = output.stdout.strip()
+    if output.returncode or not value:
+        raise ValueError(f"Could not get the terminal {capability} from tput")
+    return value
+
+
 def _stty(cmd):
     """ Prepend to 'cmd' the stty command to set the terminal size to the current one """
     if not isinstance(cmd, str):
         cmd = quote(cmd)
-    rows, cols = os.popen("tput lines; tput cols").read().split()
+    rows, cols = _tput("lines"), _tput("cols")
     return f"stty rows {rows} cols {cols} && {cmd}"
 
 
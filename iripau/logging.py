@@ -275,7 +275,7 @@ class SimpleThreadNameFormatter(logging.Formatter):
 
 def group_log_lines(
     lines: Iterable[str],
-    thread_id_regex: str,
+    thread_id_regex: str | re.Pattern,
     main_thread_id: str = "MainThread"
 ):
     """ For a log file containing entries from several threads, group the lines
@@ -287,7 +287,7 @@ def group_log_lines(
             lines: The lines to group.
             thread_id_regex: The pattern to get the thread name from each line.
                 It should have one capturing group, which will be taken as the
-                thread name.
+                thread name. It can also be an already compiled pattern.
             main_thread_id: The name of the main thread.
         Yields:
             str: The next line according to the group ordering.
@@ -305,9 +305,10 @@ def group_log_lines(
                 with open("/tmp/threaded.log") as log_file:
                     sys.stdout.writelines(group_log_lines(log_file))
     """
+    thread_id_regex = re.compile(thread_id_regex)
     lines_map = OrderedDict()
     for i, line in enumerate(lines):
-        match = re.match(thread_id_regex, line)
+        match = thread_id_regex.match(line)
         if not match:
             raise ValueError(f"Invalid log line {i}: '{line}'")
 
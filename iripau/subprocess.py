@@ -411,7 +411,7 @@ def quote(cmd: Iterable[str]):
     """ Convert the command tokens into a single string that could be pasted into
         the shell to execute the original command
     """
-    return " ".join(map(shlex.quote, cmd))
+    return shlex.join(cmd)
 
 
 def shellify(cmd: str | Iterable[str], err2out=False, comment=None):
@@ -2,10 +2,9 @@
 Generic and stand-alone threading utilities.
 """
 
-import sys
 import threading
 
-from typing import Any, Callable, Collection, Type
+from typing import Any, Callable, Collection, Iterable, Type
 from functools import wraps, _make_key as make_key
 from collections import deque
 
@@ -70,7 +69,8 @@ class AsyncResult(threading.Thread):
         )
 
         self.return_value = None
-        self.exc_info = None
+        self.exception = None
+        self._traceback = None
 
         self.start()
 
@@ -81,13 +81,14 @@ class AsyncResult(threading.Thread):
         self.wait()
 
     def run(self):
-        """ Run the target ``function``, store its return value or exception
-            information if any.
+        """ Run the target ``function``, store its return value or the
+            exception it raised, if any.
         """
         try:
             self.return_value = self._target(*self._args, **self._kwargs)
-        except:  # noqa: E722
-            self.exc_info = sys.exc_info()
+        except BaseException as e:
+            self.exception = e
+            self._traceback = e.__traceback__
 
     def get(self, timeout: float = None) -> Any:
         """ Implementation of :meth:`multiprocessing.pool.AsyncResult.get`.
@@ -106,11 +107,19 @@ class AsyncResult(threading.Thread):
         self.join(timeout)
         if self.is_alive():
             raise TimeoutError("Timeout reached while joining the thread")
-        if self.exc_info:
-            exc_type, exc_value, traceback = self.exc_info
-            raise exc_value.with_traceback(traceback)
+        if self.exception is not None:
+            raise self.exception.with_traceback(self._traceback)
         return self.return_value
 
+    @property
+    def exc_info(self):
+        """ The ``(type, value, traceback)`` tuple of the exception raised by
+            the target ``function``, or None. Kept for compatibility, prefer
+            :attr:`exception`.
+        """
+        if self.exception is not None:
+            return type(self.exception), self.exception, self._traceback
+
     def wait(self, timeout: float = None):
         """ Implementation of :meth:`multiprocessing.pool.AsyncResult.wait`.
 
@@ -139,12 +148,7 @@ class AsyncResult(threading.Thread):
         """
         if self.is_alive():
             raise ValueError("Thread has not completed")
-        try:
-            self.get()
-        except:  # noqa: E722
-            return False
-        else:
-            return True
+        return self.exception is None
 
 
 class MultiDequeuer:
@@ -176,12 +180,17 @@ class MultiDequeuer:
                 when this time (in seconds) has passed after the first element was
                 added to the queue.
             count_hint: If this is greater than 0, the queue will be consumed when
-                at least this amount of elements have been added to the queue,
-                ignoring ``time_to_consume``.
+                at least this amount of ``put`` or ``put_many`` calls are waiting
+                on it, ignoring ``time_to_consume``. A ``put_many`` call counts
+                once, no matter how many elements it adds.
             collection_type: The elements queue will be cast into this type before
                 it is passed to the ``consumer`` callable.
     """
 
+    #: Factory of the barrier each queue is waited on, taking ``parties`` and
+    #: ``timeout`` like :class:`threading.Barrier`.
+    barrier_type = threading.Barrier
+
     def __init__(
         self,
         consumer: Callable[[Collection[Any]], None],
@@ -200,7 +209,7 @@ class MultiDequeuer:
     def _new_data(self):
         return (
             deque(),
-            threading.Barrier(self.count, timeout=self.time),
+            self.barrier_type(self.count, timeout=self.time),
             threading.Lock()
         )
 
@@ -212,10 +221,26 @@ class MultiDequeuer:
                 product: Element to add to the queue.
         """
         data = self.data
+        data[0].append(product)
+        self._wait_and_consume(data)
+
+    def put_many(self, products: Iterable[Any]):
+        """ Add several elements to the queue at once. This method is meant to
+            be called by the workers. It blocks until the elements are consumed.
+
+            The elements are added with a single barrier wait, so this call
+            counts as one worker towards ``count_hint``.
 
+            Args:
+                products: Elements to add to the queue.
+        """
+        data = self.data
+        data[0].extend(products)
+        self._wait_and_consume(data)
+
+    def _wait_and_consume(self, data):
         queue, barrier, lock = data
 
-        queue.append(product)
         if self.count or self.time:
             try:
                 barrier.wait()
@@ -260,10 +285,10 @@ class FunctionCacher:
             with a lock to prevent it is executed in parallel.
         """
         self.function = function
+        self.callable = function
+        self.cache_enabled = False
         if enabled:
             self.enable_cache(synchronized)
-        else:
-            self.disable_cache()
         self.lock = threading.Lock()
 
     def __call__(self, *args, **kwargs):
@@ -274,8 +299,9 @@ class FunctionCacher:
             The synchronized argument is used as in the constructor.
             This method is not re-entrant nor thread-safe.
         """
-        if not hasattr(self, "cache"):
+        if not self.cache_enabled:
             self.cache = {}
+            self.cache_enabled = True
         if synchronized:
             if hasattr(self, "locks"):
                 del self.locks
@@ -289,18 +315,21 @@ class FunctionCacher:
         """ Disable and delete caching if not disabled already.
             This method is not re-entrant nor thread-safe.
         """
-        if hasattr(self, "cache"):
-            del self.cache
+        if not self.cache_enabled:
+            return
+        del self.cache
         if hasattr(self, "locks"):
             del self.locks
         self.callable = self.function
+        self.cache_enabled = False
 
     def clear_cache(self):
         """ Delete cache if caching is not disabled.
             This method is not re-entrant nor thread-safe.
         """
-        if hasattr(self, "cache"):
-            self.cache = {}
+        if not self.cache_enabled:
+            return
+        self.cache = {}
         if hasattr(self, "locks"):
             self.locks = {}
 
@@ -0,0 +1,35 @@
+"""
+Shared pytest configuration for the iripau tests
+"""
+
+import pytest
+
+#: Tests with these markers only run when their option is given.
+OPT_IN_MARKERS = {
+    "sudo": "--with-sudo",
+    "slow": "--run-slow"
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--with-sudo", action="store_true", default=False,
+        help="run the tests marked with 'sudo', which need passwordless sudo"
+    )
+    parser.addoption(
+        "--run-slow", action="store_true", default=False,
+        help="run the tests marked with 'slow', such as stress tests"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    skips = {
+        marker: pytest.mark.skip(reason=f"needs {option} to run")
+        for marker, option in OPT_IN_MARKERS.items()
+        if not config.getoption(option)
+    }
+
+    for item in items:
+        for marker, skip in skips.items():
+            if marker in item.keywords:
+                item.add_marker(skip)
@@ -2,14 +2,14 @@
 Tests to validate iripau.command module
 """
 
-import os
 import pytest
 
-from mock import patch
-from shlex import quote
+from mock import Mock, patch
+from types import MappingProxyType
+from shlex import join
 from socket import gethostname
-from getpass import getuser
 
+from iripau.command import _tput
 from iripau.command import _solve_ssh_users
 from iripau.command import user_cmd
 from iripau.command import local_run
@@ -20,158 +20,217 @@ from iripau.command import host_run
 from iripau.command import host_run_interactive
 
 from iripau.subprocess import DEVNULL
-
-ROWS = os.popen("tput lines").read().rstrip()
-COLS = os.popen("tput cols").read().rstrip()
-STTY_CMD = "stty rows {0} cols {1} && ".format(ROWS, COLS)
-HOSTNAME = gethostname()
-USER = getuser()
+from iripau.subprocess import CompletedProcess
+
+ENV = {"FOO": "foo", "BAR": "bar"}
+ENV_TOKENS = ["FOO=foo", "BAR=bar"]
+ENV_EXPORT = "export FOO=foo BAR=bar && "
+
+TERMINAL_SIZE = {"lines": "24", "cols": "80"}
+STTY_CMD = "stty rows 24 cols 80 && "
+CMDS = {str: "whoami; sleep 1 && echo Bye!", list: ["echo", "Hello!", "Bye!"]}
+ALIASES = {str: "echo bye", list: ["echo", "bye"], None: None}
+SOLVE_SSH_USERS_CASES = [
+    ("host1", None, ("current-user", "host1")),
+    ("host1", "current-user", ("current-user", "host1")),
+    ("host1", "other-user", ("other-user", "host1")),
+    ("current-user@host1", None, ("current-user", "host1")),
+    ("current-user@host1", "current-user", ("current-user", "host1")),
+    ("current-user@host1", "other-user", ("current-user", "current-user@host1")),
+    ("other-user@host1", None, ("other-user", "other-user@host1")),
+    ("other-user@host1", "current-user", ("other-user", "other-user@host1")),
+    ("other-user@host1", "other-user", ("other-user", "host1"))
+]
 KWARGS = {"kwarg1": "arg1", "kwarg2": 2, "kwarg3": "Sup!", "kwarg4": 4}
 
 
-def run_kwargs(
-    args, *, executable=None, stdin=None, stdout=None, stderr=None, shell=False,
-    cwd=None, env=None, user=None, encoding=None, errors=None, text=True,
-    stdout_tees=[], add_global_stdout_tees=True,
-    stderr_tees=[], add_global_stderr_tees=True,
-    prompt_tees=[], add_global_prompt_tees=True,
-    echo=None, alias=None, input=None, capture_output=False,
-    timeout=120, check=False, sigterm_timeout=10
-):
-    return locals()
+RUN_KWARGS = MappingProxyType({
+    "executable": None, "stdin": None, "stdout": None, "stderr": None, "shell": False,
+    "cwd": None, "env": None, "user": None, "encoding": None, "errors": None, "text": True,
+    "stdout_tees": [], "add_global_stdout_tees": True,
+    "stderr_tees": [], "add_global_stderr_tees": True,
+    "prompt_tees": [], "add_global_prompt_tees": True,
+    "echo": None, "alias": None, "input": None, "capture_output": False,
+    "timeout": 120, "check": False, "sigterm_timeout": 10
+})
+
+
+def run_kwargs(args, **kwargs):
+    assert RUN_KWARGS.keys() >= kwargs.keys()
+    return {"args": args, **RUN_KWARGS, **kwargs}
+
+
+# Expected (cmd, alias) for CMDS[cmd_type] and ALIASES[alias_type] being "current-user"
+USER_CMD_CASES = {
+    env_id: {
+        ("no_user", list, None): (["echo", "Hello!", "Bye!"], None),
+        ("no_user", list, list): (["echo", "Hello!", "Bye!"], ["echo", "bye"]),
+        ("no_user", list, str): (["echo", "Hello!", "Bye!"], "echo bye"),
+        ("no_user", str, None): ("whoami; sleep 1 && echo Bye!", None),
+        ("no_user", str, list): ("whoami; sleep 1 && echo Bye!", ["echo", "bye"]),
+        ("no_user", str, str): ("whoami; sleep 1 && echo Bye!", "echo bye"),
+        ("current-user", list, None): (["echo", "Hello!", "Bye!"], None),
+        ("current-user", list, list): (["echo", "Hello!", "Bye!"], ["echo", "bye"]),
+        ("current-user", list, str): (["echo", "Hello!", "Bye!"], "echo bye"),
+        ("current-user", str, None): ("whoami; sleep 1 && echo Bye!", None),
+        ("current-user", str, list): ("whoami; sleep 1 && echo Bye!", ["echo", "bye"]),
+        ("current-user", str, str): ("whoami; sleep 1 && echo Bye!", "echo bye"),
+        ("other-user", list, None): (
+            ["sudo", "-Eu", "other-user", *env_tokens, "echo", "Hello!", "Bye!"],
+            ["sudo", "-Eu", "other-user", "echo", "Hello!", "Bye!"]
+        ),
+        ("other-user", list, list): (
+            ["sudo", "-Eu", "other-user", *env_tokens, "echo", "Hello!", "Bye!"],
+            ["sudo", "-Eu", "other-user", "echo", "bye"]
+        ),
+        ("other-user", list, str): (
+            ["sudo", "-Eu", "other-user", *env_tokens, "echo", "Hello!", "Bye!"],
+            ["sudo", "-Eu", "other-user", "sh", "-c", "echo bye"]
+        ),
+        ("other-user", str, None): (
+            ["sudo", "-Eu", "other-user", *env_tokens, "sh", "-c", "whoami; sleep 1 && echo Bye!"],
+            ["sudo", "-Eu", "other-user", "sh", "-c", "whoami; sleep 1 && echo Bye!"]
+        ),
+        ("other-user", str, list): (
+            ["sudo", "-Eu", "other-user", *env_tokens, "sh", "-c", "whoami; sleep 1 && echo Bye!"],
+            ["sudo", "-Eu", "other-user", "echo", "bye"]
+        ),
+        ("other-user", str, str): (
+            ["sudo", "-Eu", "other-user", *env_tokens, "sh", "-c", "whoami; sleep 1 && echo Bye!"],
+            ["sudo", "-Eu", "other-user", "sh", "-c", "echo bye"]
+        ),
+        ("root", list, None): (
+            ["sudo", "-E", *env_tokens, "echo", "Hello!", "Bye!"],
+            ["sudo", "-E", "echo", "Hello!", "Bye!"]
+        ),
+        ("root", list, list): (
+            ["sudo", "-E", *env_tokens, "echo", "Hello!", "Bye!"],
+            ["sudo", "-E", "echo", "bye"]
+        ),
+        ("root", list, str): (
+            ["sudo", "-E", *env_tokens, "echo", "Hello!", "Bye!"],
+            ["sudo", "-E", "sh", "-c", "echo bye"]
+        ),
+        ("root", str, None): (
+            ["sudo", "-E", *env_tokens, "sh", "-c", "whoami; sleep 1 && echo Bye!"],
+            ["sudo", "-E", "sh", "-c", "whoami; sleep 1 && echo Bye!"]
+        ),
+        ("root", str, list): (
+            ["sudo", "-E", *env_tokens, "sh", "-c", "whoami; sleep 1 && echo Bye!"],
+            ["sudo", "-E", "echo", "bye"]
+        ),
+        ("root", str, str): (
+            ["sudo", "-E", *env_tokens, "sh", "-c", "whoami; sleep 1 && echo Bye!"],
+            ["sudo", "-E", "sh", "-c", "echo bye"]
+        )
+    }
+    for env_id, env_tokens in (("no_env", []), ("env", ENV_TOKENS))
+}
+# Expected (cmd, alias) for CMDS[cmd_type] without alias being "root"
+USER_CMD_BEING_ROOT_CASES = {
+    env_id: {
+        ("no_user", list): (["echo", "Hello!", "Bye!"], None),
+        ("no_user", str): ("whoami; sleep 1 && echo Bye!", None),
+        ("root", list): (["echo", "Hello!", "Bye!"], None),
+        ("root", str): ("whoami; sleep 1 && echo Bye!", None),
+        ("no-root", list): (
+            ["sudo", "-Eu", "no-root", *env_tokens, "echo", "Hello!", "Bye!"],
+            ["sudo", "-Eu", "no-root", "echo", "Hello!", "Bye!"]
+        ),
+        ("no-root", str): (
+            ["sudo", "-Eu", "no-root", *env_tokens, "sh", "-c", "whoami; sleep 1 && echo Bye!"],
+            ["sudo", "-Eu", "no-root", "sh", "-c", "whoami; sleep 1 && echo Bye!"]
+        )
+    }
+    for env_id, env_tokens in (("no_env", []), ("env", ENV_TOKENS))
+}
+
+
+@pytest.fixture
+def terminal_size(monkeypatch):
+    monkeypatch.setattr("iripau.command._tput", TERMINAL_SIZE.__getitem__)
 
 
-class TestCommand:
+@pytest.fixture
+def as_current_user(monkeypatch):
+    monkeypatch.setattr("iripau.command.USER", "current-user")
 
-    @patch("iripau.command.USER", new="current-user")
-    def test_solve_ssh_users(self):
-        assert ("current-user", "host1") == \
-            _solve_ssh_users("host1", None)
 
-        assert ("current-user", "host1") == \
-            _solve_ssh_users("host1", "current-user")
+@pytest.fixture
+def as_root(monkeypatch):
+    monkeypatch.setattr("iripau.command.USER", "root")
 
-        assert ("other-user", "host1") == \
-            _solve_ssh_users("host1", "other-user")
 
-        assert ("current-user", "host1") == \
-            _solve_ssh_users("current-user@host1", None)
+@pytest.fixture(params=["localhost", "hostname"])
+def local_host(request):
+    """ The host name is only looked up by the tests using it """
+    return gethostname() if request.param == "hostname" else request.param
 
-        assert ("current-user", "host1") == \
-            _solve_ssh_users("current-user@host1", "current-user")
 
-        assert ("current-user", "current-user@host1") == \
-            _solve_ssh_users("current-user@host1", "other-user")
+@pytest.fixture
+def mock_run(monkeypatch):
+    mock_run = Mock()
+    monkeypatch.setattr("iripau.subprocess.run", mock_run)
+    return mock_run
 
-        assert ("other-user", "other-user@host1") == \
-            _solve_ssh_users("other-user@host1", None)
 
-        assert ("other-user", "other-user@host1") == \
-            _solve_ssh_users("other-user@host1", "current-user")
+@pytest.fixture
+def mock_spawn(monkeypatch):
+    mock_spawn = Mock()
+    monkeypatch.setattr("iripau.command.spawn", mock_spawn)
+    return mock_spawn
 
-        assert ("other-user", "host1") == \
-            _solve_ssh_users("other-user@host1", "other-user")
 
-    @pytest.mark.parametrize("env", [None, {"FOO": "foo", "BAR": "bar"}], ids=["no_env", "env"])
+class TestCommand:
+
+    @pytest.mark.parametrize("host, local_user, expected", SOLVE_SSH_USERS_CASES)
+    @pytest.mark.usefixtures("as_current_user")
+    def test_solve_ssh_users(self, host, local_user, expected):
+        assert expected == _solve_ssh_users(host, local_user)
+
+    @pytest.mark.parametrize("stdout, returncode", [
+        ("", 0),
+        ("", 1),
+        ("24\n", 1)
+    ], ids=["empty", "error", "error_and_output"])
+    def test_tput_failure(self, monkeypatch, stdout, returncode):
+        output = CompletedProcess(["tput", "lines"], returncode, stdout)
+        monkeypatch.setattr("iripau.command._run", Mock(return_value=output))
+        with pytest.raises(ValueError):
+            _tput("lines")
+
+    @pytest.mark.parametrize("env_id, env", [
+        ("no_env", None),
+        ("env", ENV)
+    ], ids=["no_env", "env"])
     @pytest.mark.parametrize("alias_type", [None, list, str])
     @pytest.mark.parametrize("cmd_type", [list, str])
     @pytest.mark.parametrize("user", ["no_user", "current-user", "other-user", "root"])
-    @patch("iripau.command.USER", new="current-user")
-    def test_user_cmd(self, user, cmd_type, alias_type, env):
+    @pytest.mark.usefixtures("as_current_user")
+    def test_user_cmd(self, user, cmd_type, alias_type, env_id, env):
+        expected = USER_CMD_CASES[env_id][user, cmd_type, alias_type]
         if user == "no_user":
             user = None
 
-        env_tokens = list(map("{0[0]}={0[1]}".format, (env or {}).items()))
-        alias = {
-            str: "echo bye",
-            list: ["echo", "bye"],
-            None: None
-        }[alias_type]
-        if cmd_type is str:
-            cmd = "whoami; sleep 1 && echo Bye!"
-            internal_alias = {
-                str: ["sh", "-c", alias],
-                list: alias,
-                None: ["sh", "-c", cmd]
-            }[alias_type]
-            expected_cmds = {
-                None: (
-                    cmd,
-                    alias
-                ),
-                "current-user": (
-                    cmd,
-                    alias
-                ),
-                "other-user": (
-                    ["sudo", "-Eu", user] + env_tokens + ["sh", "-c", cmd],
-                    ["sudo", "-Eu", user] + internal_alias
-                ),
-                "root": (
-                    ["sudo", "-E"] + env_tokens + ["sh", "-c", cmd],
-                    ["sudo", "-E"] + internal_alias
-                )
-            }
-        else:
-            cmd = ["echo", "Hello!", "Bye!"]
-            internal_alias = {
-                str: ["sh", "-c", alias],
-                list: alias,
-                None: cmd
-            }[alias_type]
-            expected_cmds = {
-                None: (
-                    cmd,
-                    alias
-                ),
-                "current-user": (
-                    cmd,
-                    alias
-                ),
-                "other-user": (
-                    ["sudo", "-Eu", user] + env_tokens + cmd,
-                    ["sudo", "-Eu", user] + internal_alias
-                ),
-                "root": (
-                    ["sudo", "-E"] + env_tokens + cmd,
-                    ["sudo", "-E"] + internal_alias
-                )
-            }
-        assert expected_cmds[user] == user_cmd(user, cmd, alias, env)
-
-    @pytest.mark.parametrize("env", [None, {"FOO": "foo", "BAR": "bar"}], ids=["no_env", "env"])
+        cmd, alias = CMDS[cmd_type], ALIASES[alias_type]
+        assert expected == user_cmd(user, cmd, alias, env)
+
+    @pytest.mark.parametrize("env_id, env", [
+        ("no_env", None),
+        ("env", ENV)
+    ], ids=["no_env", "env"])
     @pytest.mark.parametrize("cmd_type", [list, str])
     @pytest.mark.parametrize("user", ["no_user", "root", "no-root"])
-    @patch("iripau.command.USER", new="root")
-    def test_user_cmd_being_root(self, user, cmd_type, env):
+    @pytest.mark.usefixtures("as_root")
+    def test_user_cmd_being_root(self, user, cmd_type, env_id, env):
+        expected = USER_CMD_BEING_ROOT_CASES[env_id][user, cmd_type]
         if user == "no_user":
             user = None
 
-        env_tokens = list(map("{0[0]}={0[1]}".format, (env or {}).items()))
-        if cmd_type is str:
-            cmd = "whoami; sleep 1 && echo Bye!"
-            expected_cmds = {
-                None: (cmd, None),
-                "root": (cmd, None),
-                "no-root": (
-                    ["sudo", "-Eu", user] + env_tokens + ["sh", "-c", cmd],
-                    ["sudo", "-Eu", user, "sh", "-c", cmd]
-                )
-            }
-        else:
-            cmd = ["echo", "Hello!", "Bye!"]
-            expected_cmds = {
-                None: (cmd, None),
-                "root": (cmd, None),
-                "no-root": (
-                    ["sudo", "-Eu", user] + env_tokens + cmd,
-                    ["sudo", "-Eu", user] + cmd
-                )
-            }
-        assert expected_cmds[user] == user_cmd(user, cmd, None, env)
+        cmd = CMDS[cmd_type]
+        assert expected == user_cmd(user, cmd, None, env)
 
     @pytest.mark.parametrize("cmd_type", [list, str])
-    @patch("iripau.subprocess.run")
     def test_local_run(self, mock_run, cmd_type):
         cmd = "echo Hello!" if cmd_type is str else ["echo", "Hello!"]
 
@@ -182,29 +241,27 @@ class TestCommand:
         )
         assert mock_run.return_value == output
 
-    @pytest.mark.parametrize("env", [None, {"FOO": "foo", "BAR": "bar"}], ids=["no_env", "env"])
+    @pytest.mark.parametrize("env", [None, ENV], ids=["no_env", "env"])
     @pytest.mark.parametrize("cmd_type", [list, str])
-    @patch("iripau.command.spawn")
+    @pytest.mark.usefixtures("terminal_size")
     def test_local_run_interactive(self, mock_spawn, cmd_type, env):
         cmd = "bash -i" if cmd_type is str else ["bash", "-i"]
 
         result = local_run_interactive(cmd, env=env)
 
         if cmd_type is list:
-            cmd = " ".join(quote(token) for token in cmd)
+            cmd = join(cmd)
         cmd = STTY_CMD + cmd
         if env:
-            env_tokens = list(map("{0[0]}={0[1]}".format, env.items()))
-            cmd = "export " + " ".join(env_tokens) + " && " + cmd
+            cmd = ENV_EXPORT + cmd
         mock_spawn.assert_called_once_with(["sh", "-ic", cmd])
         assert mock_spawn.return_value == result
 
     @pytest.mark.parametrize("ssh_password", [None, "a_password"], ids=["no_ssh_pass", "ssh_pass"])
     @pytest.mark.parametrize("ssh_args", [[], ["-O", "exit"]], ids=["no_ssh_args", "ssh_args"])
-    @pytest.mark.parametrize("env", [None, {"FOO": "foo", "BAR": "bar"}], ids=["no_env", "env"])
+    @pytest.mark.parametrize("env", [None, ENV], ids=["no_env", "env"])
     @pytest.mark.parametrize("cwd", [None, "/some/path"], ids=["no_cwd", "cwd"])
     @pytest.mark.parametrize("cmd_type", [list, str])
-    @patch("iripau.subprocess.run")
     def test_ssh_run(self, mock_run, cmd_type, cwd, env, ssh_args, ssh_password):
         host = "user@host"
         cmd = "echo Hello!" if cmd_type is str else ["echo", "Hello!"]
@@ -218,16 +275,16 @@ class TestCommand:
         )
 
         if cmd_type is not str:
-            cmd = " ".join(map(quote, cmd))
+            cmd = join(cmd)
         alias = ["ssh", host, cmd]
         if cwd:
             cmd = "cd /some/path && " + cmd
         if env:
-            cmd = "export FOO=foo BAR=bar && " + cmd
-        ssh_cmd = ["ssh"] + ssh_args + [host, cmd]
+            cmd = ENV_EXPORT + cmd
+        ssh_cmd = ["ssh", *ssh_args, host, cmd]
 
         if ssh_password:
-            ssh_cmd = ["sshpass", "-p", ssh_password] + ssh_cmd
+            ssh_cmd = ["sshpass", "-p", ssh_password, *ssh_cmd]
 
         mock_run.assert_called_once_with(
             **run_kwargs(ssh_cmd, shell=False, alias=alias, stdin=DEVNULL, capture_output=True)
@@ -237,7 +294,7 @@ class TestCommand:
     @pytest.mark.parametrize("ssh_password", [None, "a_password"], ids=["no_ssh_pass", "ssh_pass"])
     @pytest.mark.parametrize("ssh_args", [[], ["-O", "exit"]], ids=["no_ssh_args", "ssh_args"])
     @pytest.mark.parametrize("cmd_type", [list, str])
-    @patch("iripau.command.spawn")
+    @pytest.mark.usefixtures("terminal_size")
     def test_ssh_run_interactive(self, mock_spawn, cmd_type, ssh_args, ssh_password):
         host = "user@host"
         cmd = "bash -i" if cmd_type is str else ["bash", "-i"]
@@ -250,43 +307,39 @@ class TestCommand:
         )
 
         if cmd_type is list:
-            cmd = " ".join(quote(token) for token in cmd)
-        ssh_cmd = ["ssh", "-tt"] + ssh_args + [host, STTY_CMD + cmd]
+            cmd = join(cmd)
+        ssh_cmd = ["ssh", "-tt", *ssh_args, host, STTY_CMD + cmd]
 
         if ssh_password:
-            ssh_cmd = ["sshpass", "-p", ssh_password] + ssh_cmd
+            ssh_cmd = ["sshpass", "-p", ssh_password, *ssh_cmd]
 
         mock_spawn.assert_called_once_with(ssh_cmd)
         assert mock_spawn.return_value == result
 
-    @pytest.mark.parametrize("host", ["localhost", HOSTNAME])
     @patch("iripau.command.ssh_args")
     @patch("iripau.command.local_args", return_value=KWARGS)
-    @patch("iripau.subprocess.run")
-    def test_host_run_local(self, mock_run, mock_local_args, mock_ssh_args, host):
+    def test_host_run_local(self, mock_local_args, mock_ssh_args, mock_run, local_host):
         command = "echo Hello!"
 
-        output = host_run(command, host=host)
+        output = host_run(command, host=local_host)
 
         mock_local_args.assert_called_once_with(command)
         mock_ssh_args.assert_not_called()
         mock_run.assert_called_once_with(**KWARGS)
         assert mock_run.return_value == output
 
-    @pytest.mark.parametrize("host", ["localhost", HOSTNAME])
     @patch("iripau.command.local_run_interactive")
-    def test_host_run_interactive_local(self, mock_run, host):
+    def test_host_run_interactive_local(self, mock_run, local_host):
         command = "echo Hello!"
 
-        result = host_run_interactive(command, host=host)
+        result = host_run_interactive(command, host=local_host)
 
         mock_run.assert_called_once_with(command)
         assert mock_run.return_value == result
 
     @patch("iripau.command.ssh_args", return_value=KWARGS)
     @patch("iripau.command.local_args")
-    @patch("iripau.subprocess.run")
-    def test_host_run_remote(self, mock_run, mock_local_args, mock_ssh_args):
+    def test_host_run_remote(self, mock_local_args, mock_ssh_args, mock_run):
         host = "user@host"
         command = "echo Hello!"
 
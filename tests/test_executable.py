@@ -2,7 +2,7 @@
 Tests to validate iripau.executable module
 """
 
-from mock import MagicMock, patch, call
+from mock import Mock, patch, call
 
 from iripau.executable import Command
 from iripau.executable import Executable
@@ -11,7 +11,7 @@ from iripau.executable import Executable
 class TestExecutable:
 
     def test_command_call(self):
-        parent = MagicMock()
+        parent = Mock()
         command = "group"
 
         group = Command(parent, command)
@@ -28,7 +28,7 @@ class TestExecutable:
 
     @patch("iripau.executable.Command")
     def test_command_subcommand(self, mock_command):
-        parent = MagicMock()
+        parent = Mock()
         command = "group"
 
         group = Command(parent, command)
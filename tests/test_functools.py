@@ -23,7 +23,7 @@ class TestFunctools:
         operation = operator.gt if outcome else operator.le
 
         def condition(arg1, arg2):
-            sleep(0.4)
+            sleep(0.04)
             data[0] = data[0] + 1
             return operation(data[0], 3)
 
@@ -31,16 +31,16 @@ class TestFunctools:
             with pytest.raises(TimeoutError):
                 wait_for(
                     condition, "Arg1", "Arg2",
-                    _timeout=1,
+                    _timeout=0.1,
                     _outcome=outcome,
-                    _poll_time=0.5
+                    _poll_time=0.05
                 )
         else:
             wait_for(
                 condition, "Arg1", "Arg2",
-                _timeout=2,
+                _timeout=0.3,
                 _outcome=outcome,
-                _poll_time=0.5
+                _poll_time=0.05
             )
 
     def test_wait_for_with_stop_condition(self):
@@ -56,7 +56,7 @@ class TestFunctools:
         with pytest.raises(InterruptedError):
             wait_for(
                 condition, "Arg1", "Arg2",
-                _poll_time=0.5,
+                _poll_time=0.01,
                 _stop_condition=stop_condition
             )
 
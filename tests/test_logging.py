@@ -2,21 +2,97 @@
 Tests to validate iripau.logging module
 """
 
+import io
 import os
 import re
 import pytest
 import random
 import logging
-import tempfile
 import threading
 
 from time import sleep
+from concurrent.futures import ThreadPoolExecutor
 
 from iripau.logging import LoggerFile
 from iripau.logging import SimpleThreadNameFormatter
 from iripau.logging import group_log_lines
 
 
+THREAD_ID_REGEX = re.compile(r".* - \s*([^:\s]+).*: .*", re.ASCII)
+GROUPED_LINES_REGEX = re.compile(
+    ".{34}: (1|2) - First line\n"
+    ".{34}: \\[stdout\\] \\1 - Simulated output\n"
+    ".{34}: \\[stderr\\] \\1 - Simulated error\n"
+    ".{34}: \\1 - Last line\n"
+    ".{34}: (1|2) - First line\n"
+    ".{34}: \\[stdout\\] \\2 - Simulated output\n"
+    ".{34}: \\[stderr\\] \\2 - Simulated error\n"
+    ".{34}: \\2 - Last line\n"
+    ".{34}: Line from Main\n"
+    ".{34}: (3|4) - First line\n"
+    ".{34}: \\[stdout\\] \\3 - Simulated output\n"
+    ".{34}: \\[stderr\\] \\3 - Simulated error\n"
+    ".{34}: \\3 - Last line\n"
+    ".{34}: (3|4) - First line\n"
+    ".{34}: \\[stdout\\] \\4 - Simulated output\n"
+    ".{34}: \\[stderr\\] \\4 - Simulated error\n"
+    ".{34}: \\4 - Last line\n"
+)
+
+
+class WaitableStreamHandler(logging.StreamHandler):
+    """ A StreamHandler that allows to block until some records are emitted """
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self.emitted = threading.Semaphore(0)
+
+    def emit(self, record):
+        super().emit(record)
+        self.emitted.release()
+
+    def wait(self, count, timeout=5):
+        for _ in range(count):
+            assert self.emitted.acquire(timeout=timeout)
+
+
+def make_handler(stream, format, handler_type=logging.StreamHandler):
+    handler = handler_type(stream)
+    handler.setLevel(logging.DEBUG)
+    handler.setFormatter(SimpleThreadNameFormatter(format))
+    return handler
+
+
+@pytest.fixture
+def get_logger():
+    """ Return a function to setup a logger with a handler.
+        The level and handlers of the loggers are restored at teardown.
+    """
+    originals = []
+
+    def get_logger(name, handler):
+        logger = logging.getLogger(name)
+        originals.append((logger, logger.level, logger.handlers[:]))
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        return logger
+
+    yield get_logger
+
+    for logger, level, handlers in reversed(originals):
+        logger.setLevel(level)
+        logger.handlers = handlers
+
+
+@pytest.fixture(scope="class")
+def pool():
+    """ Persistent worker threads. Their names are short so the log format
+        does not truncate them.
+    """
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="T") as pool:
+        yield pool
+
+
 class TestLogging:
 
     @staticmethod
@@ -25,24 +101,17 @@ class TestLogging:
         stream.flush()
 
     @staticmethod
-    def read(stream):
-        sleep(0.1)
+    def read(stream, handler=None, count=0):
+        if handler:
+            handler.wait(count)
         stream.seek(0)
         return stream.read()
 
-    def test_logger_file(self):
-        output_file = tempfile.SpooledTemporaryFile(mode="w+t")
-
-        # Setup log handler
-        formatter = SimpleThreadNameFormatter("%(levelname)s: %(message)s")
-        handler = logging.StreamHandler(output_file)
-        handler.setLevel(logging.DEBUG)
-        handler.setFormatter(formatter)
+    def test_logger_file(self, get_logger):
+        output_file = io.StringIO()
 
-        # Setup logger
-        logger = logging.getLogger("dummy_logger")
-        logger.setLevel(logging.DEBUG)
-        logger.addHandler(handler)
+        handler = make_handler(output_file, "%(levelname)s: %(message)s", WaitableStreamHandler)
+        logger = get_logger("dummy_logger", handler)
 
         logger_file = LoggerFile(logger, logging.INFO)
 
@@ -53,7 +122,7 @@ class TestLogging:
 
         # Write the rest of the line
         self.write(logger_file, " bye\n")
-        content = self.read(output_file)
+        content = self.read(output_file, handler, 1)
         assert content.endswith(
             "INFO: Hello, bye\n"
         )
@@ -67,7 +136,7 @@ class TestLogging:
             "DummyString\n"
         )
 
-        content = self.read(output_file)
+        content = self.read(output_file, handler, 4)
         assert content.endswith(
             "INFO: SomeString\n"
             "INFO: AnotherString\n"
@@ -81,7 +150,7 @@ class TestLogging:
             "SomeString AnotherString TestString DummyString\n"
         )
 
-        content = self.read(output_file)
+        content = self.read(output_file, handler, 1)
         assert content.endswith(
             "INFO: SomeString AnotherString TestString DummyString\n"
         )
@@ -89,7 +158,7 @@ class TestLogging:
         # Write one line using file descriptor
         fd = logger_file.fileno()
         os.write(fd, b"Another dummy string\n")
-        content = self.read(output_file)
+        content = self.read(output_file, handler, 1)
         assert content.endswith(
             "INFO: Another dummy string\n"
         )
@@ -104,7 +173,7 @@ class TestLogging:
         )
 
         logger_file.close()
-        content = self.read(output_file)
+        content = self.read(output_file, handler, 4)
         assert content.endswith(
             "INFO: Line1\n"
             "INFO: Line2\n"
@@ -113,95 +182,50 @@ class TestLogging:
         )
 
     @staticmethod
-    def log_stuff(id, normal_logger, stdout_logger, stderr_logger):
-        sleep(random.uniform(0.1, 0.3))
+    def log_stuff(id, barrier, normal_logger, stdout_logger, stderr_logger):
+        barrier.wait()
+
+        sleep(random.uniform(0, 0.002))
         normal_logger.info(f"{id} - First line")
 
-        sleep(random.uniform(0.1, 0.3))
+        sleep(random.uniform(0, 0.002))
         stdout_logger.info(f"{id} - Simulated output")
 
-        sleep(random.uniform(0.1, 0.3))
+        sleep(random.uniform(0, 0.002))
         stderr_logger.info(f"{id} - Simulated error")
 
-        sleep(random.uniform(0.1, 0.3))
+        sleep(random.uniform(0, 0.002))
         normal_logger.info(f"{id} - Last line")
 
     @classmethod
-    def log_stuff_in_threads(cls, ids, *loggers):
-        threads = [
-            threading.Thread(target=cls.log_stuff, args=(id, *loggers))
-            for id in ids
-        ]
-
-        for thread in threads:
-            thread.start()
-
-        for thread in threads:
-            thread.join()
+    def log_stuff_in_threads(cls, pool, ids, *loggers):
+        barrier = threading.Barrier(len(ids))
+        list(pool.map(lambda id: cls.log_stuff(id, barrier, *loggers), ids))
 
-    def test_group_log_lines(self):
-        output_file = tempfile.SpooledTemporaryFile(mode="w+t")
+    def test_group_log_lines(self, get_logger, pool):
+        output_file = io.StringIO()
 
         normal_log_format = "%(asctime).19s - %(threadName)12.12s: %(message)s"
         output_log_format = "%(asctime).19s - %(threadName)12.12s: [%(name)s] %(message)s"
 
-        # Setup normal log handler
-        formatter = SimpleThreadNameFormatter(normal_log_format)
-        handler = logging.StreamHandler(output_file)
-        handler.setLevel(logging.DEBUG)
-        handler.setFormatter(formatter)
-
         # Setup normal logger
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.DEBUG)
-        logger.addHandler(handler)
+        logger = get_logger(__name__, make_handler(output_file, normal_log_format))
 
-        # Setup stdout and stderr log handler
-        formatter = SimpleThreadNameFormatter(output_log_format)
-        handler = logging.StreamHandler(output_file)
-        handler.setLevel(logging.DEBUG)
-        handler.setFormatter(formatter)
+        # Setup stdout and stderr loggers sharing the same handler
+        handler = make_handler(output_file, output_log_format)
+        stdout_logger = get_logger("stdout", handler)
+        stderr_logger = get_logger("stderr", handler)
 
-        # Setup stdout logger
-        stdout_logger = logging.getLogger("stdout")
-        stdout_logger.setLevel(logging.DEBUG)
-        stdout_logger.addHandler(handler)
-
-        # Setup stderr logger
-        stderr_logger = logging.getLogger("stderr")
-        stderr_logger.setLevel(logging.DEBUG)
-        stderr_logger.addHandler(handler)
-
-        self.log_stuff_in_threads((1, 2), logger, stdout_logger, stderr_logger)
+        self.log_stuff_in_threads(pool, (1, 2), logger, stdout_logger, stderr_logger)
         logger.info("Line from Main")
-        self.log_stuff_in_threads((3, 4), logger, stdout_logger, stderr_logger)
-
-        pattern = (
-            ".{34}: (1|2) - First line\n"
-            ".{34}: \\[stdout\\] \\1 - Simulated output\n"
-            ".{34}: \\[stderr\\] \\1 - Simulated error\n"
-            ".{34}: \\1 - Last line\n"
-            ".{34}: (1|2) - First line\n"
-            ".{34}: \\[stdout\\] \\2 - Simulated output\n"
-            ".{34}: \\[stderr\\] \\2 - Simulated error\n"
-            ".{34}: \\2 - Last line\n"
-            ".{34}: Line from Main\n"
-            ".{34}: (3|4) - First line\n"
-            ".{34}: \\[stdout\\] \\3 - Simulated output\n"
-            ".{34}: \\[stderr\\] \\3 - Simulated error\n"
-            ".{34}: \\3 - Last line\n"
-            ".{34}: (3|4) - First line\n"
-            ".{34}: \\[stdout\\] \\4 - Simulated output\n"
-            ".{34}: \\[stderr\\] \\4 - Simulated error\n"
-            ".{34}: \\4 - Last line\n"
-        )
+        self.log_stuff_in_threads(pool, (3, 4), logger, stdout_logger, stderr_logger)
 
         content = self.read(output_file)
-        assert not re.fullmatch(pattern, content)  # Verify content is scrambled
+        assert not GROUPED_LINES_REGEX.fullmatch(content)  # Verify content is scrambled
 
         output_file.seek(0)
-        grouped_lines = group_log_lines(output_file, r".* - \s*([^:\s]+).*: .*")
-        assert re.fullmatch(pattern, "".join(grouped_lines))
+        grouped_lines = group_log_lines(output_file, THREAD_ID_REGEX)
+        assert GROUPED_LINES_REGEX.fullmatch("".join(grouped_lines))
 
     def test_group_log_lines_invalid(self):
         lines = ["Some log line\n"]
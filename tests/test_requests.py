@@ -2,8 +2,8 @@
 Tests to validate iripau.requests module
 """
 
-import pytest
 import mock
+import pytest
 
 from iripau.requests import Session
 from iripau.requests import delete
@@ -15,27 +15,52 @@ from iripau.requests import post
 from iripau.requests import put
 from iripau.requests import hide_content
 
+TEST_HOST = "dummyjson.com"
 URL = "https://some.url.com:8080/api"
 KWARGS = {
     "kwarg1": "Value-1",
     "kwarg2": "Value-2"
 }
 
+# Expected in the echoed curl command of test_curlify_output
+CURL_PRESENT = {
+    # Kept and hidden headers
+    "-H 'Accept: application/json'",
+    "-H 'API-Key: ***'",
+    "-H 'Authorization: ***'",
+    # Because of using data argument in the request
+    "-H 'Content-Type: application/x-www-form-urlencoded'",
+    "-d 'name=The+Name&status=Old%24'"
+}
 
-class TestRequests:
+# Omitted headers, not expected in the echoed curl command of test_curlify_output
+CURL_ABSENT = {
+    "-H 'Accept-Encoding: gzip, deflate'",
+    "-H 'Connection: keep-alive'",
+    "-H 'User-Agent: python-requests/2.32.3'"
+}
 
-    @pytest.mark.parametrize("hide_output", [False, True], ids=["show_output", "hide_output"])
-    @pytest.mark.parametrize("session_verify", [False, True], ids=["request", "session"])
-    @pytest.mark.parametrize("verify", [False, True], ids=["insecure", "secure"])
-    def test_curlify(self, verify, session_verify, hide_output, capfd):
-        session = Session()
 
-        if session_verify:
-            session.verify = verify
+@pytest.fixture
+def mocked_http(requests_mock):
+    """ Answer the requests to TEST_HOST without touching the network """
+    requests_mock.post(f"https://{TEST_HOST}/test", text="{}")
+
+
+@pytest.fixture(scope="class")
+def session():
+    """ A single Session shared by every test in the class """
+    with Session() as session:
+        yield session
+
 
+class TestRequests:
+
+    @staticmethod
+    def curlify_post(session, capfd, verify=None, hide_output=False):
         response = session.post(
-            "https://dummyjson.com/test",
-            verify=None if session_verify else verify,
+            f"https://{TEST_HOST}/test",
+            verify=verify,
             headers={
                 "API-Key": "QWERTY123",
                 "Accept": "application/json",
@@ -52,31 +77,24 @@ class TestRequests:
         )
 
         out, err = capfd.readouterr()
-        if verify:
-            assert "--insecure" not in out
-        else:
-            assert "--insecure" in out
+        assert not err
+        return response, out
+
+    @pytest.mark.parametrize("hide_output", [False, True], ids=["show_output", "hide_output"])
+    def test_curlify_output(self, hide_output, capfd, mocked_http, session):
+        session.verify = True
+        response, out = self.curlify_post(session, capfd, hide_output=hide_output)
 
         if hide_output:
             assert out.endswith("***\n")
         else:
             assert not out.endswith("***\n")
 
-        # Omitted headers
-        assert "-H 'Accept: application/json'" in out
-        assert "-H 'API-Key: ***'" in out
-        assert "-H 'Authorization: ***'" in out
+        for text in CURL_PRESENT:
+            assert text in out
 
-        # Hidden headers
-        assert "-H 'Accept-Encoding: gzip, deflate'" not in out
-        assert "-H 'Connection: keep-alive'" not in out
-        assert "-H 'User-Agent: python-requests/2.32.3'" not in out
-
-        # Because of using data argument in the request
-        assert "-H 'Content-Type: application/x-www-form-urlencoded'" in out
-        assert "-d 'name=The+Name&status=Old%24'" in out
-
-        assert not err
+        for text in CURL_ABSENT:
+            assert text not in out
 
         # The request object was not touched
         assert "Accept-Encoding" in response.request.headers
@@ -86,44 +104,26 @@ class TestRequests:
         assert response.request.headers["API-Key"] != "***"
         assert response.request.headers["Authorization"] != "***"
 
-    @mock.patch("iripau.requests.Session")
-    def test_delete(self, mock_session):
-        response = delete(URL, **KWARGS)
-        mock_session.return_value.delete.assert_called_once_with(URL, **KWARGS)
-        assert mock_session.return_value.delete.return_value == response
-
-    @mock.patch("iripau.requests.Session")
-    def test_get(self, mock_session):
-        response = get(URL, **KWARGS)
-        mock_session.return_value.get.assert_called_once_with(URL, **KWARGS)
-        assert mock_session.return_value.get.return_value == response
-
-    @mock.patch("iripau.requests.Session")
-    def test_head(self, mock_session):
-        response = head(URL, **KWARGS)
-        mock_session.return_value.head.assert_called_once_with(URL, **KWARGS)
-        assert mock_session.return_value.head.return_value == response
-
-    @mock.patch("iripau.requests.Session")
-    def test_options(self, mock_session):
-        response = options(URL, **KWARGS)
-        mock_session.return_value.options.assert_called_once_with(URL, **KWARGS)
-        assert mock_session.return_value.options.return_value == response
-
-    @mock.patch("iripau.requests.Session")
-    def test_patch(self, mock_session):
-        response = patch(URL, **KWARGS)
-        mock_session.return_value.patch.assert_called_once_with(URL, **KWARGS)
-        assert mock_session.return_value.patch.return_value == response
-
-    @mock.patch("iripau.requests.Session")
-    def test_post(self, mock_session):
-        response = post(URL, **KWARGS)
-        mock_session.return_value.post.assert_called_once_with(URL, **KWARGS)
-        assert mock_session.return_value.post.return_value == response
+    @pytest.mark.parametrize("session_verify, verify, insecure", [
+        (False, None, True),
+        (True, None, False),
+        (True, False, True),
+        (False, True, False)
+    ], ids=["session_insecure", "session_secure", "request_insecure", "request_secure"])
+    def test_curlify_verify(self, session_verify, verify, insecure, capfd, mocked_http, session):
+        session.verify = session_verify
+        _, out = self.curlify_post(session, capfd, verify)
+
+        if insecure:
+            assert "--insecure" in out
+        else:
+            assert "--insecure" not in out
 
+    @pytest.mark.parametrize("function", [delete, get, head, options, patch, post, put],
+                             ids=lambda function: function.__name__)
     @mock.patch("iripau.requests.Session")
-    def test_put(self, mock_session):
-        response = put(URL, **KWARGS)
-        mock_session.return_value.put.assert_called_once_with(URL, **KWARGS)
-        assert mock_session.return_value.put.return_value == response
+    def test_method(self, mock_session, function):
+        method = getattr(mock_session.return_value, function.__name__)
+        response = function(URL, **KWARGS)
+        method.assert_called_once_with(URL, **KWARGS)
+        assert method.return_value == response
@@ -4,8 +4,6 @@ Tests to validate iripau.shutil module
 
 import os
 import pytest
-import shutil
-import tempfile
 
 from iripau.shutil import FileLock
 from iripau.shutil import create_file
@@ -18,19 +16,13 @@ from iripau.shutil import rotate
 
 class TestFileLock:
 
-    @classmethod
-    def setup_class(cls):
-        cls.file_name = "a_file.lock"
+    @pytest.fixture
+    def lock_path(self, tmp_path):
+        return str(tmp_path / "a_file.lock")
 
-    def teardown_method(self):
-        try:
-            os.remove(self.file_name)
-        except FileNotFoundError:
-            pass
-
-    def test_interfering(self):
-        lock_1 = FileLock(self.file_name)
-        lock_2 = FileLock(self.file_name)
+    def test_interfering(self, lock_path):
+        lock_1 = FileLock(lock_path)
+        lock_2 = FileLock(lock_path)
 
         assert not lock_1.acquired
         assert not lock_2.acquired
@@ -46,7 +38,7 @@ class TestFileLock:
         assert not lock_2.locked()
 
         with pytest.raises(TimeoutError):
-            lock_2.acquire(timeout=2)
+            lock_2.acquire(timeout=0.1)
 
         assert lock_1.acquired
         assert not lock_2.acquired
@@ -75,19 +67,23 @@ class TestFileLock:
         assert not lock_1.locked()
         assert not lock_2.locked()
 
-    def test_context(self):
-        with FileLock(self.file_name):
-            assert os.path.exists(self.file_name)
-        assert not os.path.exists(self.file_name)
+    def test_context(self, lock_path):
+        with FileLock(lock_path):
+            assert os.path.exists(lock_path)
+        assert not os.path.exists(lock_path)
 
 
-class TestShutil:
+@pytest.fixture(scope="class")
+def workspace(tmp_path_factory):
+    return tmp_path_factory.mktemp("shutil_tests")
 
-    def setup_method(self):
-        self.workspace = tempfile.mkdtemp()
 
-    def teardown_method(self):
-        shutil.rmtree(self.workspace)
+class TestShutil:
+
+    @pytest.fixture(autouse=True)
+    def per_test_workspace(self, workspace, request):
+        self.workspace = str(workspace / request.node.name)
+        os.makedirs(self.workspace)
 
     def path(self, *paths):
         return os.path.join(self.workspace, *paths)
@@ -2,13 +2,16 @@
 Tests to validate iripau.subprocess module
 """
 
+import re
 import sys
 import pytest
 import subprocess
 
 from mock import patch
-from shlex import quote
-from tempfile import SpooledTemporaryFile
+from itertools import product
+from functools import lru_cache
+from shlex import join
+from tempfile import TemporaryFile
 
 from iripau.subprocess import DEVNULL
 from iripau.subprocess import PIPE
@@ -31,9 +34,30 @@ KWARGS = {
     "text": True
 }
 
-
-def get_prompt_and_command(command, err2out=False, timeout=None):
-    prompt = subprocess.run(
+TEE_STDOUT_COMMAND = "echo This goes to stdout"
+TEE_STDERR_COMMAND = "echo This goes to stderr >&2"
+
+# Function wrapping run, extra arguments it passes to run and how it builds its result
+RUN_WRAPPERS = [
+    (call, {}, lambda output: output.returncode),
+    (check_call, {"check": True}, lambda output: output.returncode),
+    (check_output, {"check": True, "stdout": PIPE}, lambda output: output.stdout),
+    (
+        getoutput,
+        {"stdout": PIPE, "stderr": STDOUT, "shell": True, "text": True},
+        lambda output: output.stdout
+    ),
+    (
+        getstatusoutput,
+        {"stdout": PIPE, "stderr": STDOUT, "shell": True, "text": True},
+        lambda output: (output.returncode, output.stdout)
+    )
+]
+
+
+@lru_cache(maxsize=1)
+def get_prompt():
+    return subprocess.run(
         "echo '' | bash -i 2>&1 1>/dev/null | head -1",
         shell=True,
         check=True,
@@ -41,8 +65,10 @@ def get_prompt_and_command(command, err2out=False, timeout=None):
         stdout=subprocess.PIPE
     ).stdout[:-1]
 
+
+def get_command(command, err2out=False, timeout=None):
     if not isinstance(command, str):
-        command = " ".join(map(quote, command))
+        command = join(command)
 
     if err2out:
         command += " 2>&1"
@@ -50,7 +76,38 @@ def get_prompt_and_command(command, err2out=False, timeout=None):
     if timeout:
         command += f" # timeout={timeout}"
 
-    return f"{prompt}{command}"
+    return command
+
+
+def get_prompt_and_command(command, err2out=False, timeout=None):
+    return get_prompt() + get_command(command, err2out, timeout)
+
+
+@pytest.fixture(scope="session")
+def strip_prompt():
+    """ Return a function that removes the leading bash prompt from a string """
+    prompt_regex = re.compile(re.escape(get_prompt()))
+
+    def strip(string):
+        match = prompt_regex.match(string)
+        assert match, f"{string!r} does not start with the prompt"
+        return string[match.end():]
+
+    return strip
+
+
+@lru_cache(maxsize=2)
+def get_tee_transcripts(redirect):
+    """ Echoed prompts and full output of running the tee commands one after the other """
+    stdout_command_prompt = get_prompt_and_command(TEE_STDOUT_COMMAND, redirect) + "\n"
+    stderr_command_prompt = get_prompt_and_command(TEE_STDERR_COMMAND, redirect) + "\n"
+    return (
+        stdout_command_prompt,
+        stderr_command_prompt,
+        stdout_command_prompt + stderr_command_prompt,
+        stdout_command_prompt + "This goes to stdout\n" +
+        stderr_command_prompt + "This goes to stderr\n"
+    )
 
 
 def read_file(file):
@@ -68,21 +125,21 @@ class TestSubprocess:
     def test_popen(self, echo, capfd):
         command = "echo $BASHPID; echo Sup!; sleep 1; echo Bye. >&2"
         stdout_tees = [
-            SpooledTemporaryFile(mode="w+t"),
-            SpooledTemporaryFile(mode="w+t"),
-            SpooledTemporaryFile(mode="w+t")
+            TemporaryFile(mode="w+t"),
+            TemporaryFile(mode="w+t"),
+            TemporaryFile(mode="w+t")
         ]
         stderr_tees = [
-            SpooledTemporaryFile(mode="w+t"),
-            SpooledTemporaryFile(mode="w+t"),
-            SpooledTemporaryFile(mode="w+t")
+            TemporaryFile(mode="w+t"),
+            TemporaryFile(mode="w+t"),
+            TemporaryFile(mode="w+t")
         ]
         prompt_tees = [
-            SpooledTemporaryFile(mode="w+t"),
-            SpooledTemporaryFile(mode="w+t"),
-            SpooledTemporaryFile(mode="w+t")
+            TemporaryFile(mode="w+t"),
+            TemporaryFile(mode="w+t"),
+            TemporaryFile(mode="w+t")
         ]
-        all_tee = SpooledTemporaryFile(mode="w+t")
+        all_tee = TemporaryFile(mode="w+t")
 
         process = Popen(
             command,
@@ -128,7 +185,7 @@ class TestSubprocess:
             assert "" == out == err
 
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_success(self, echo, capfd):
+    def test_run_success(self, echo, capfd, strip_prompt):
         command = ["echo", "Hello!"]
         output = run(command, echo=echo, **KWARGS)
 
@@ -139,12 +196,12 @@ class TestSubprocess:
 
         out, err = capfd.readouterr()
         if echo:
-            assert get_prompt_and_command(command) + f"\n{output.stdout}" == out
+            assert get_command(command) + f"\n{output.stdout}" == strip_prompt(out)
             assert output.stderr == err
         else:
             assert "" == out == err
 
-    def test_run_non_capturing_echo(self, capfd):
+    def test_run_non_capturing_echo(self, capfd, strip_prompt):
         command = ["echo", "Hello!"]
         output = run(command, stdout=None, stderr=None, echo=True)
 
@@ -154,12 +211,12 @@ class TestSubprocess:
         assert output.time > 0
 
         out, err = capfd.readouterr()
-        assert get_prompt_and_command(command) + "\nHello!\n" == out
+        assert get_command(command) + "\nHello!\n" == strip_prompt(out)
         assert "" == err
 
     @pytest.mark.parametrize("check", [False, True], ids=["no_check", "check"])
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_error(self, echo, check, capfd):
+    def test_run_error(self, echo, check, capfd, strip_prompt):
         command = "echo Hello! >&2; exit 1"
         if check:
             with pytest.raises(CalledProcessError):
@@ -174,54 +231,48 @@ class TestSubprocess:
 
             out, err = capfd.readouterr()
             if echo:
-                assert get_prompt_and_command(command) + f"\n{output.stdout}" == out
+                assert get_command(command) + f"\n{output.stdout}" == strip_prompt(out)
                 assert output.stderr == err
             else:
                 assert "" == out == err
 
     def test_run_time(self):
-        command = ["sleep", "3"]
+        command = ["sleep", "0.1"]
         output = run(command)
-        assert output.time > 3
-
+        assert output.time > 0.1
+
+    @patch("iripau.subprocess.time", return_value=103.5)
+    @patch("iripau.subprocess.psutil")
+    def test_run_time_clock(self, mock_psutil, mock_time):
+        mock_psutil.Process.return_value.create_time.return_value = 100.0
+        output = run(["true"])
+        assert output.time == 3.5
+
+    @pytest.mark.parametrize("command, sigterm_timeout", [
+        (["sleep", "0.5"], None),
+        ("trap '' TERM; sleep 0.5", 0.1),
+        ("trap '' TERM; sleep 0.5", 0)
+    ], ids=["terminate", "try_terminate_then_kill", "kill"])
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_timeout_and_terminate(self, echo, capfd):
-        command = ["sleep", "3"]
-        timeout = 1
-        with pytest.raises(TimeoutExpired):
-            run(command, timeout=timeout, echo=echo)
+    def test_run_timeout(self, echo, command, sigterm_timeout, capfd, strip_prompt):
+        timeout = 0.2
+        kwargs = {"timeout": timeout, "echo": echo}
+        if sigterm_timeout is not None:
+            kwargs["sigterm_timeout"] = sigterm_timeout
+        if isinstance(command, str):
+            kwargs["shell"] = True
 
-        if echo:
-            out, err = capfd.readouterr()
-            assert get_prompt_and_command(command, False, timeout) + "\n" == out
-            assert "" == err
-
-    @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_timeout_try_terminate_then_kill(self, echo, capfd):
-        command = "trap '' TERM; sleep 3"
-        timeout = 1
         with pytest.raises(TimeoutExpired):
-            run(command, shell=True, timeout=timeout, echo=echo, sigterm_timeout=1)
+            run(command, **kwargs)
 
         if echo:
             out, err = capfd.readouterr()
-            assert get_prompt_and_command(command, False, timeout) + "\n" == out
+            assert get_command(command, False, timeout) + "\n" == strip_prompt(out)
             assert "" == err
 
+    @pytest.mark.sudo
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_timeout_and_kill(self, echo, capfd):
-        command = "trap '' TERM; sleep 3"
-        timeout = 1
-        with pytest.raises(TimeoutExpired):
-            run(command, shell=True, timeout=timeout, echo=echo, sigterm_timeout=0)
-
-        if echo:
-            out, err = capfd.readouterr()
-            assert get_prompt_and_command(command, False, timeout) + "\n" == out
-            assert "" == err
-
-    @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_timeout_and_terminate_sudo(self, echo, capfd):
+    def test_run_timeout_and_terminate_sudo(self, echo, capfd, strip_prompt):
         command = ["sudo", "sudo", "sh", "-c",
                    "sudo sleep 30 | $(cat | (dd 2>/dev/null) | cat)"]
         timeout = 3
@@ -230,23 +281,25 @@ class TestSubprocess:
 
         if echo:
             out, err = capfd.readouterr()
-            assert get_prompt_and_command(command, False, timeout) + "\n" == out
+            assert get_command(command, False, timeout) + "\n" == strip_prompt(out)
             assert "" == err
 
+    @pytest.mark.sudo
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_timeout_try_terminate_then_kill_sudo(self, echo, capfd):
+    def test_run_timeout_try_terminate_then_kill_sudo(self, echo, capfd, strip_prompt):
         command = "trap '' TERM; sudo sleep 30"
         timeout = 3
         with pytest.raises(TimeoutExpired):
-            run(command, shell=True, timeout=timeout, echo=echo, sigterm_timeout=1)
+            run(command, shell=True, timeout=timeout, echo=echo, sigterm_timeout=0.1)
 
         if echo:
             out, err = capfd.readouterr()
-            assert get_prompt_and_command(command, False, timeout) + "\n" == out
+            assert get_command(command, False, timeout) + "\n" == strip_prompt(out)
             assert "" == err
 
+    @pytest.mark.sudo
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_timeout_and_kill_sudo(self, echo, capfd):
+    def test_run_timeout_and_kill_sudo(self, echo, capfd, strip_prompt):
         command = "trap '' TERM; sudo sleep 30"
         timeout = 3
         with pytest.raises(TimeoutExpired):
@@ -254,12 +307,12 @@ class TestSubprocess:
 
         if echo:
             out, err = capfd.readouterr()
-            assert get_prompt_and_command(command, False, timeout) + "\n" == out
+            assert get_command(command, False, timeout) + "\n" == strip_prompt(out)
             assert "" == err
 
     @pytest.mark.parametrize("text", [False, True], ids=["binary", "text"])
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_input(self, echo, text, capfd):
+    def test_run_input(self, echo, text, capfd, strip_prompt):
         if text:
             encoder = decoder = lambda x: x
         else:
@@ -282,27 +335,30 @@ class TestSubprocess:
 
         out, err = capfd.readouterr()
         if echo:
-            assert get_prompt_and_command(command) + f"\n{decoder(output.stdout)}" == out
+            assert get_command(command) + f"\n{decoder(output.stdout)}" == strip_prompt(out)
             assert output.stderr == encoder(err)
         else:
             assert "" == out == err
 
-    @pytest.mark.parametrize("manual_echo", [False, True], ids=["no_manual_echo", "manual_echo"])
-    @pytest.mark.parametrize("extra_tees", [0, 1, 3], ids=["no_extra", "one_extra", "few_extra"])
-    @pytest.mark.parametrize("stderr", [None, STDOUT], ids=["no_redirect", "redirect"])
-    @pytest.mark.parametrize("stdout", [None, PIPE, FILE], ids=["no_capture", "pipe", "file"])
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
     @pytest.mark.parametrize("simulation", [False, True], ids=["reality", "simulation"])
-    def test_run_tee(self, simulation, echo, stdout, stderr, extra_tees, manual_echo, capfd):
+    def test_run_tee(self, simulation, echo, capfd):
+        for stdout, stderr, extra_tees, manual_echo in product(
+            [None, PIPE, FILE], [None, STDOUT], [0, 1, 3], [False, True]
+        ):
+            self.check_run_tee(simulation, echo, stdout, stderr, extra_tees, manual_echo, capfd)
+
+    @staticmethod
+    def check_run_tee(simulation, echo, stdout, stderr, extra_tees, manual_echo, capfd):
         redirect = stderr is STDOUT
-        stdout_command = "echo This goes to stdout"
-        stderr_command = "echo This goes to stderr >&2"
+        stdout_command = TEE_STDOUT_COMMAND
+        stderr_command = TEE_STDERR_COMMAND
 
         count = extra_tees - 1 if extra_tees > 1 else extra_tees
-        prompt_tees = {SpooledTemporaryFile(mode="w+t") for _ in range(count)}
-        stdout_tees = {SpooledTemporaryFile(mode="w+t") for _ in range(count)}
-        stderr_tees = {SpooledTemporaryFile(mode="w+t") for _ in range(count)}
-        all_tees = {SpooledTemporaryFile(mode="w+t") for _ in range(extra_tees - count)}
+        prompt_tees = {TemporaryFile(mode="w+t") for _ in range(count)}
+        stdout_tees = {TemporaryFile(mode="w+t") for _ in range(count)}
+        stderr_tees = {TemporaryFile(mode="w+t") for _ in range(count)}
+        all_tees = {TemporaryFile(mode="w+t") for _ in range(extra_tees - count)}
 
         # Ensure we are sending the intended number of files
         assert extra_tees == len(prompt_tees) + len(all_tees)
@@ -322,13 +378,10 @@ class TestSubprocess:
             "prompt_tees": prompt_tees | all_tees
         }
 
-        expected_stdout_command_prompt = get_prompt_and_command(stdout_command, redirect) + "\n"
-        expected_stderr_command_prompt = get_prompt_and_command(stderr_command, redirect) + "\n"
-        expected_prompt = expected_stdout_command_prompt + expected_stderr_command_prompt
-        expected_output = (
-            expected_stdout_command_prompt + "This goes to stdout\n" +
-            expected_stderr_command_prompt + "This goes to stderr\n"
-        )
+        (
+            expected_stdout_command_prompt, expected_stderr_command_prompt,
+            expected_prompt, expected_output
+        ) = get_tee_transcripts(redirect)
 
         if redirect:
             expected_stdout = "This goes to stdout\nThis goes to stderr\n"
@@ -360,7 +413,6 @@ class TestSubprocess:
                 expected_captured_stdout = ""
                 expected_captured_stderr = "" if simulation else expected_stderr
 
-        count = 1
         if simulation:
             fake_stdout_command = stdout_command
             fake_stderr_command = stderr_command
@@ -373,46 +425,43 @@ class TestSubprocess:
                 fake_stderr_command += " 2>&1"
                 fake_stdout_2, fake_stderr_2 = fake_stderr_2, fake_stdout_2
 
-            for _ in range(count):
-                Popen.simulate(fake_stdout_command, fake_stdout_1, fake_stderr_1, **kwargs)
-                Popen.simulate(fake_stderr_command, fake_stdout_2, fake_stderr_2, **kwargs)
+            Popen.simulate(fake_stdout_command, fake_stdout_1, fake_stderr_1, **kwargs)
+            Popen.simulate(fake_stderr_command, fake_stdout_2, fake_stderr_2, **kwargs)
         else:
             expected_stdout_1 = expected_stderr_1 = expected_stdout_2 = expected_stderr_2 = None
             if stdout is not None:
                 expected_stdout_1 = "This goes to stdout\n"
                 expected_stdout_2 = "This goes to stderr\n" if redirect else ""
 
-            for _ in range(count):
-                output = run(stdout_command, stdout=stdout, stderr=stderr, shell=True, **kwargs)
-                assert expected_stdout_1 == output.stdout
-                assert expected_stderr_1 == output.stderr
+            output = run(stdout_command, stdout=stdout, stderr=stderr, shell=True, **kwargs)
+            assert expected_stdout_1 == output.stdout
+            assert expected_stderr_1 == output.stderr
 
-                output = run(stderr_command, stdout=stdout, stderr=stderr, shell=True, **kwargs)
-                assert expected_stdout_2 == output.stdout
-                assert expected_stderr_2 == output.stderr
+            output = run(stderr_command, stdout=stdout, stderr=stderr, shell=True, **kwargs)
+            assert expected_stdout_2 == output.stdout
+            assert expected_stderr_2 == output.stderr
 
-        expected_content = expected_stdout * count
         for file in stdout_tees - {sys.stdout}:
-            assert expected_content == read_file(file)
+            assert expected_stdout == read_file(file)
 
-        expected_content = expected_stderr * count
         for file in stderr_tees - {sys.stderr}:
-            assert expected_content == read_file(file)
+            assert expected_stderr == read_file(file)
 
-        expected_content = expected_prompt * count
         for file in prompt_tees - {sys.stdout}:
-            assert expected_content == read_file(file)
+            assert expected_prompt == read_file(file)
 
-        expected_content = expected_output * count
         for file in all_tees:
-            assert expected_content == read_file(file)
+            assert expected_output == read_file(file)
+
+        for file in (prompt_tees | stdout_tees | stderr_tees | all_tees) - {sys.stdout, sys.stderr}:
+            file.close()
 
         out, err = capfd.readouterr()
-        assert expected_captured_stdout * count == out
-        assert expected_captured_stderr * count == err
+        assert expected_captured_stdout == out
+        assert expected_captured_stderr == err
 
     @pytest.mark.parametrize("echo", [False, True], ids=["no_echo", "echo"])
-    def test_run_alias(self, echo, capfd):
+    def test_run_alias(self, echo, capfd, strip_prompt):
         command = ["echo", "-ne", "Hello!\\tBye."]
         alias = ["echo", "Hello!\\tBye."]
         output = run(command, echo=echo, alias=alias, **KWARGS)
@@ -424,69 +473,16 @@ class TestSubprocess:
 
         out, err = capfd.readouterr()
         if echo:
-            assert get_prompt_and_command(alias) + f"\n{output.stdout}" == out
+            assert get_command(alias) + f"\n{output.stdout}" == strip_prompt(out)
             assert output.stderr == err
         else:
             assert "" == out == err
 
     @patch("iripau.subprocess.run")
-    def test_call(self, mock_run):
-        returncode = call("arg1", "arg2", kwarg1="kwarg1")
-
-        mock_run.assert_called_once_with("arg1", "arg2", kwarg1="kwarg1")
-        assert mock_run.return_value.returncode == returncode
-
-    @patch("iripau.subprocess.run")
-    def test_check_call(self, mock_run):
-        check_call("arg1", "arg2", kwarg1="kwarg1")
-
-        mock_run.assert_called_once_with(
-            "arg1",
-            "arg2",
-            kwarg1="kwarg1",
-            check=True
-        )
-
-    @patch("iripau.subprocess.run")
-    def test_check_output(self, mock_run):
-        stdout = check_output("arg1", "arg2", kwarg1="kwarg1")
-
-        mock_run.assert_called_once_with(
-            "arg1",
-            "arg2",
-            kwarg1="kwarg1",
-            check=True,
-            stdout=PIPE
-        )
-        assert mock_run.return_value.stdout == stdout
-
-    @patch("iripau.subprocess.run")
-    def test_getoutput(self, mock_run):
-        stdout = getoutput("arg1", "arg2", kwarg1="kwarg1")
-
-        mock_run.assert_called_once_with(
-            "arg1",
-            "arg2",
-            kwarg1="kwarg1",
-            stdout=PIPE,
-            stderr=STDOUT,
-            shell=True,
-            text=True
-        )
-        assert mock_run.return_value.stdout == stdout
+    def test_run_wrappers(self, mock_run):
+        for function, run_kwargs, get_result in RUN_WRAPPERS:
+            mock_run.reset_mock()
+            result = function("arg1", "arg2", kwarg1="kwarg1")
 
-    @patch("iripau.subprocess.run")
-    def test_getstatusoutput(self, mock_run):
-        returncode, stdout = getstatusoutput("arg1", "arg2", kwarg1="kwarg1")
-
-        mock_run.assert_called_once_with(
-            "arg1",
-            "arg2",
-            kwarg1="kwarg1",
-            stdout=PIPE,
-            stderr=STDOUT,
-            shell=True,
-            text=True
-        )
-        assert mock_run.return_value.returncode == returncode
-        assert mock_run.return_value.stdout == stdout
+            mock_run.assert_called_once_with("arg1", "arg2", kwarg1="kwarg1", **run_kwargs)
+            assert get_result(mock_run.return_value) == result
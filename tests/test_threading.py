@@ -3,12 +3,12 @@ Tests to validate iripau.threading module
 """
 
 import pytest
-import random
 import threading
 
 from time import sleep
-from itertools import groupby
-from multiprocessing.dummy import Pool
+from itertools import count, groupby
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 from iripau.threading import AsyncResult
 from iripau.threading import MultiDequeuer
@@ -16,63 +16,244 @@ from iripau.threading import synchronized
 from iripau.threading import cached
 
 
+WALL_TIMEOUT = 5
+
+
+class VirtualClock:
+    """ Time that only passes when advanced, driving the timeouts of the
+        barriers created by MultiDequeuer
+    """
+
+    def __init__(self):
+        self.now = 0
+        self.waiters = []
+        self.condition = threading.Condition()
+
+    def barrier(self, parties, timeout=None):
+        return VirtualBarrier(self, parties, timeout)
+
+    def submit(self, pool, function, *args):
+        future = pool.submit(function, *args)
+        future.add_done_callback(self.notify)
+        return future
+
+    def notify(self, future=None):
+        with self.condition:
+            self.condition.notify_all()
+
+    def blocked(self):
+        return sum(not barrier.released(*waiter) for barrier, *waiter in self.waiters)
+
+    def settle(self, futures):
+        """ Block until every pending future is blocked on a barrier """
+        with self.condition:
+            assert self.condition.wait_for(
+                lambda: self.blocked() == sum(not future.done() for future in futures),
+                timeout=WALL_TIMEOUT
+            )
+
+    def advance(self, seconds, futures):
+        with self.condition:
+            self.now += seconds
+            self.condition.notify_all()
+        self.settle(futures)
+
+
+class VirtualBarrier:
+    """ threading.Barrier whose timeout follows a VirtualClock
+
+        Like the real one, it is cyclic: once all of the parties arrive, it is
+        reset for the next cycle, so a late party waits for that cycle. When a
+        wait times out the barrier is broken, which releases the current waiters
+        with BrokenBarrierError, same as any wait after that.
+
+        A wait also times out after WALL_TIMEOUT real seconds, so a party that
+        the clock can never release does not block the pool forever.
+    """
+
+    def __init__(self, clock, parties, timeout=None):
+        self.clock = clock
+        self.parties = parties
+        self.timeout = timeout
+        self.count = 0
+        self.cycle = 0
+        self.broken = False
+
+    def released(self, cycle, deadline):
+        return (
+            self.broken or self.cycle != cycle or
+            deadline is not None and deadline <= self.clock.now
+        )
+
+    def wait(self):
+        clock = self.clock
+        with clock.condition:
+            if self.broken:
+                raise threading.BrokenBarrierError
+
+            self.count += 1
+            if self.count == self.parties:
+                self.count = 0
+                self.cycle += 1
+                clock.condition.notify_all()
+                return
+
+            cycle = self.cycle
+            deadline = None if self.timeout is None else clock.now + self.timeout
+            waiter = (self, cycle, deadline)
+            clock.waiters.append(waiter)
+            clock.condition.notify_all()
+            try:
+                clock.condition.wait_for(
+                    lambda: self.released(cycle, deadline), timeout=WALL_TIMEOUT
+                )
+            finally:
+                clock.waiters.remove(waiter)
+
+            if self.cycle == cycle:
+                self.broken = True
+                clock.condition.notify_all()
+                raise threading.BrokenBarrierError
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ThreadPoolExecutor(max_workers=1000) as pool:
+        yield pool
+
+
+@pytest.fixture(params=[
+    lambda: synchronized,
+    lambda: synchronized(),
+    lambda: synchronized(threading.BoundedSemaphore())
+], ids=["no_parenthesis", "empty_parenthesis", "parenthesis"])
+def synchronizer(request):
+    """ Each way of applying the synchronized decorator """
+    return request.param()
+
+
+@pytest.fixture(scope="class")
+def md_pool():
+    """ Enough workers for every product of a MultiDequeuer test to block at once """
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        yield pool
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = VirtualClock()
+    monkeypatch.setattr(MultiDequeuer, "barrier_type", clock.barrier)
+    return clock
+
+
 class TestAsyncResult:
 
     def test_success(self):
+        done = threading.Event()
+
         def some_function(arg1, arg2=None):
-            sleep(3)
+            done.wait(5)
             return arg1 + arg2
 
         result = AsyncResult(some_function, 1, 2)
-        result.wait(1)
+        result.wait(0.01)
         assert not result.ready()
         with pytest.raises(ValueError):
             result.successful()
         with pytest.raises(TimeoutError):
-            result.get(1)
+            result.get(0.01)
+        done.set()
         assert 3 == result.get()
         assert result.ready()
         assert result.successful()
 
     def test_success_context(self):
+        done = threading.Event()
+
         def some_function(arg1, arg2=None):
-            sleep(4)
+            done.wait(5)
             return arg1 + arg2
 
         with AsyncResult(some_function, 1, 2) as result:
-            result.wait(1)
+            result.wait(0.01)
             assert not result.ready()
             with pytest.raises(ValueError):
                 result.successful()
             with pytest.raises(TimeoutError):
-                result.get(1)
+                result.get(0.01)
+            done.set()
         assert result.ready()
         assert 3 == result.get()
         assert result.successful()
 
     def test_exception(self):
+        done = threading.Event()
+
         def some_function(arg1, arg2=None):
-            sleep(3)
+            done.wait(5)
             assert False
 
         result = AsyncResult(some_function, 1)
-        result.wait(1)
+        result.wait(0.01)
         assert not result.ready()
         with pytest.raises(ValueError):
             result.successful()
         with pytest.raises(TimeoutError):
-            result.get(1)
+            result.get(0.01)
+        done.set()
         with pytest.raises(AssertionError):
             result.get()
         assert result.ready()
         assert not result.successful()
 
+    def test_exception_get_twice(self):
+        def some_function():
+            assert False
+
+        result = AsyncResult(some_function)
+        result.wait()
+        with pytest.raises(AssertionError) as first:
+            result.get()
+        with pytest.raises(AssertionError) as second:
+            result.get()
+        assert len(first.traceback) == len(second.traceback)
+
+        exc_type, exc_value, traceback = result.exc_info
+        assert AssertionError is exc_type
+        assert result.exception is exc_value
+        assert traceback is not None
+
 
 class TestMultiDequeuer:
 
-    def test_consume_immediately(self):
+    @staticmethod
+    def produce(clock, pool, put, batches, interval=0.1, max_intervals=20):
+        """ Call put with each product from the pool, advancing the clock by
+            interval before each batch of products and then until all of the
+            calls return, up to max_intervals times. The products of a batch
+            are put at the same time.
+        """
+        results = []
+        for batch in batches:
+            clock.advance(interval, results)
+            barrier = threading.Barrier(len(batch), timeout=WALL_TIMEOUT)
+
+            def burst(product):
+                barrier.wait()
+                put(product)
+
+            results.extend(clock.submit(pool, burst, product) for product in batch)
+            clock.settle(results)
+
+        for _ in range(max_intervals):
+            if all(result.done() for result in results):
+                break
+            clock.advance(interval, results)
+        assert all(result.done() for result in results), "Some products were never consumed"
+        [result.result() for result in results]
+
+    def test_consume_immediately(self, md_pool, clock):
         num_products = 10
-        num_threads = num_products
         data = []
 
         def consumer(products):
@@ -80,18 +261,12 @@ class TestMultiDequeuer:
 
         md = MultiDequeuer(consumer, collection_type=set)
 
-        with Pool(num_threads) as pool:
-            results = []
-            for i in range(num_products):
-                sleep(0.1)
-                results.append(pool.apply_async(md.put, (i,)))
-            [result.get() for result in results]
+        self.produce(clock, md_pool, md.put, [[i] for i in range(num_products)])
 
         assert [{0}, {1}, {2}, {3}, {4}, {5}, {6}, {7}, {8}, {9}] == data
 
-    def test_consume_after_time(self):
+    def test_consume_after_time(self, md_pool, clock):
         num_products = 10
-        num_threads = num_products
         data = []
 
         def consumer(products):
@@ -99,18 +274,12 @@ class TestMultiDequeuer:
 
         md = MultiDequeuer(consumer, 0.7, collection_type=set)
 
-        with Pool(num_threads) as pool:
-            results = []
-            for i in range(num_products):
-                sleep(0.1)
-                results.append(pool.apply_async(md.put, (i,)))
-            [result.get() for result in results]
+        self.produce(clock, md_pool, md.put, [[i] for i in range(num_products)])
 
         assert [{0, 1, 2, 3, 4, 5, 6}, {7, 8, 9}] == data
 
-    def test_consume_when_count_reached(self):
+    def test_consume_when_count_reached(self, md_pool, clock):
         num_products = 10
-        num_threads = num_products
         data = []
 
         def consumer(products):
@@ -118,18 +287,13 @@ class TestMultiDequeuer:
 
         md = MultiDequeuer(consumer, None, 5, set)
 
-        with Pool(num_threads) as pool:
-            results = []
-            for i in range(num_products):
-                sleep(0.1)
-                results.append(pool.apply_async(md.put, (i,)))
-            [result.get() for result in results]
+        products = list(range(num_products))
+        self.produce(clock, md_pool, md.put, [products[:5], products[5:]])
 
         assert [{0, 1, 2, 3, 4}, {5, 6, 7, 8, 9}] == data
 
-    def test_consume_mixed(self):
+    def test_consume_mixed(self, md_pool, clock):
         num_products = 10
-        num_threads = num_products
         data = []
 
         def consumer(products):
@@ -137,56 +301,61 @@ class TestMultiDequeuer:
 
         md = MultiDequeuer(consumer, 0.5, 4, set)
 
-        with Pool(num_threads) as pool:
-            results = []
-            for i in range(num_products):
-                sleep(0.1)
-                results.append(pool.apply_async(md.put, (i,)))
-            [result.get() for result in results]
+        products = list(range(num_products))
+        self.produce(clock, md_pool, md.put, [products[:4], products[4:8], products[8:]])
 
         assert [{0, 1, 2, 3}, {4, 5, 6, 7}, {8, 9}] == data
 
+    def test_put_many(self, md_pool, clock):
+        num_producers = 4
+        data = []
 
-class TestThreading:
+        def consumer(products):
+            data.append(products)
 
-    @pytest.mark.parametrize("cases", ["no_parenthesis", "empty_parenthesis", "parenthesis"])
-    def test_synchronized(self, cases):
-        num_inserts = 500
-        num_threads = 500
-        data = []
+        md = MultiDequeuer(consumer, None, 2, set)
 
-        match cases:
-            case "no_parenthesis":
-                decorator = synchronized
-            case "empty_parenthesis":
-                decorator = synchronized()
-            case "parenthesis":
-                decorator = synchronized(threading.BoundedSemaphore())
+        products = [(2 * i, 2 * i + 1) for i in range(num_producers)]
+        self.produce(clock, md_pool, md.put_many, [products[:2], products[2:]])
 
-        @decorator
+        assert [{0, 1, 2, 3}, {4, 5, 6, 7}] == data
+
+
+class TestThreading:
+
+    @pytest.mark.parametrize("num_threads, num_inserts", [
+        (32, 64),
+        pytest.param(500, 500, marks=pytest.mark.slow)
+    ], ids=["fast", "stress"])
+    def test_synchronized(self, synchronizer, num_threads, num_inserts, pool):
+        data = [None] * (num_threads * num_inserts)
+        positions = count()
+
+        @synchronizer
         def f(arg):
             for i in range(num_inserts):
-                data.append(arg)
+                data[next(positions)] = arg
+                sleep(0)  # Let other threads run, they must still wait for the lock
 
-        with Pool(num_threads) as pool:
-            results = [pool.apply_async(f, (i,)) for i in range(num_threads)]
-            [result.get() for result in results]
+        results = [pool.submit(f, i) for i in range(num_threads)]
+        [result.result() for result in results]
 
-        assert len(list(groupby(data))) == num_threads
-        assert len(data) == num_threads * num_inserts
+        assert sum(1 for _ in groupby(data)) == num_threads
+        assert num_threads * num_inserts == next(positions)
 
     @pytest.mark.parametrize("shifted", [True, False], ids=["no_parenthesis", "parenthesis"])
-    def test_cached(self, shifted):
-        num_inserts = 50
-        num_repeats = 40
-        num_threads = num_inserts * num_repeats
+    def test_cached(self, shifted, pool):
+        num_inserts = 10
+        num_repeats = 8
         data = []
+        barrier = threading.Barrier(num_inserts, timeout=5)
 
         decorator = cached if shifted else cached()
 
         @decorator
         def f(arg):
-            sleep(random.random())
+            barrier.wait()  # All of the keys are being cached at the same time
+            sleep(0.05)
             data.append(arg)
             return len(data)
 
@@ -197,29 +366,24 @@ class TestThreading:
             for j in range(num_repeats)
         ]
 
-        with Pool(num_threads) as pool:
-            results = [
-                pool.apply_async(f, (i,))
-                for i in expected_data
-                for j in range(num_repeats)
-            ]
-            values = [result.get() for result in results]
-
-        assert expected_values != values
-        assert expected_data != data
+        results = [
+            pool.submit(f, i)
+            for i in expected_data
+            for j in range(num_repeats)
+        ]
+        values = [result.result() for result in results]
 
-        assert expected_values == sorted(values)
-        assert expected_data == sorted(data)
+        assert Counter(expected_values) == Counter(values)
+        assert Counter(expected_data) == Counter(data)
 
-    def test_cached_synchronized(self):
-        num_inserts = 25
-        num_repeats = 40
-        num_threads = num_inserts * num_repeats
+    def test_cached_synchronized(self, pool):
+        num_inserts = 10
+        num_repeats = 8
         data = []
 
         @cached(synchronized=True)
         def f(arg):
-            sleep(random.random())
+            sleep(0.05)
             data.append(arg)
             return len(data)
 
@@ -230,13 +394,35 @@ class TestThreading:
             for j in range(num_repeats)
         ]
 
-        with Pool(num_threads) as pool:
-            results = [
-                pool.apply_async(f, (i,))
-                for i in expected_data
-                for j in range(num_repeats)
-            ]
-            values = [result.get() for result in results]
+        results = [
+            pool.submit(f, i)
+            for i in expected_data
+            for j in range(num_repeats)
+        ]
+        values = [result.result() for result in results]
 
         assert expected_values == values
         assert expected_data == data
+
+    def test_cached_toggle(self):
+        data = []
+
+        @cached(enabled=False)
+        def f(arg):
+            data.append(arg)
+            return len(data)
+
+        f.clear_cache()
+        f.disable_cache()
+        assert [1, 2] == [f(0), f(0)]
+
+        f.enable_cache()
+        assert [3, 3] == [f(0), f(0)]
+
+        f.clear_cache()
+        assert [4, 4] == [f(0), f(0)]
+
+        f.disable_cache()
+        f.disable_cache()
+        assert not f.cache_enabled
+        assert [5, 6] == [f(0), f(0)]